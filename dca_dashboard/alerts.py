@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Service d'alertes : détecte le franchissement de niveaux de score.
+
+Les règles sont indexées par (ETF, horizon) et triées par niveau : un
+tick ne rescore que les ETF ayant reçu une nouvelle cotation, puis une
+recherche dichotomique isole les règles franchies entre l'ancien et le
+nouveau score. Les notifications passent par des « sinks » (objets
+exposant ``send(alerts)``).
+
+Lancement : ``python -m dca_dashboard.alerts --rules regles.json``
+"""
+import argparse
+import json
+import logging
+import time
+import urllib.request
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from .cache import get_namespace
+from .constants import ETFS, SCORING_MODES, TIMEFRAMES
+from .scoring import check_mode, timeframe_scores
+
+logger = logging.getLogger(__name__)
+
+# Horizon virtuel désignant la somme des scores par période
+TOTAL = 'Total'
+DIRECTIONS = ('hausse', 'baisse', 'both')
+# Alertes conservées par sink en échec, renvoyées au tick suivant
+MAX_PENDING = 1000
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    """Règle : alerte quand le score `horizon` de `etf` franchit `level`."""
+    etf: str
+    horizon: str
+    level: float
+    direction: str = 'both'
+
+    def __post_init__(self):
+        if self.etf not in ETFS:
+            raise ValueError(f"ETF inconnu : {self.etf}")
+        if self.horizon != TOTAL and self.horizon not in TIMEFRAMES:
+            raise ValueError(f"Horizon inconnu : {self.horizon}")
+        if self.direction not in DIRECTIONS:
+            raise ValueError(f"Direction inconnue : {self.direction}")
+
+
+@dataclass(frozen=True)
+class Alert:
+    """Franchissement constaté d'une règle."""
+    rule: AlertRule
+    previous: float
+    current: float
+    date: str
+
+    def to_dict(self) -> dict:
+        d = asdict(self.rule)
+        d.update(previous=self.previous, current=self.current, date=self.date)
+        return d
+
+
+class _LevelIndex:
+    """Règles d'un couple (ETF, horizon) triées par niveau."""
+
+    def __init__(self):
+        self.levels: List[float] = []
+        self.rules: List[AlertRule] = []
+
+    def add(self, rule: AlertRule):
+        i = bisect_right(self.levels, rule.level)
+        self.levels.insert(i, rule.level)
+        self.rules.insert(i, rule)
+
+    def remove(self, rule: AlertRule):
+        lo = bisect_left(self.levels, rule.level)
+        hi = bisect_right(self.levels, rule.level)
+        for i in range(lo, hi):
+            if self.rules[i] == rule:
+                del self.levels[i], self.rules[i]
+                return
+
+    def crossed(self, previous: float, current: float) -> List[AlertRule]:
+        """Règles dont le niveau est franchi en passant de previous à current."""
+        if current > previous:
+            # Franchissement à la hausse : previous < niveau <= current
+            lo = bisect_right(self.levels, previous)
+            hi = bisect_right(self.levels, current)
+            return [r for r in self.rules[lo:hi] if r.direction != 'baisse']
+        if current < previous:
+            # Franchissement à la baisse : current <= niveau < previous
+            lo = bisect_left(self.levels, current)
+            hi = bisect_left(self.levels, previous)
+            return [r for r in self.rules[lo:hi] if r.direction != 'hausse']
+        return []
+
+
+class FileSink:
+    """Ajoute chaque alerte au fichier `path` (une ligne JSON par alerte)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, alerts: List[Alert]):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for alert in alerts:
+                f.write(json.dumps(alert.to_dict(), ensure_ascii=False) + '\n')
+
+
+class WebhookSink:
+    """Poste le lot d'alertes en JSON vers `url`."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alerts: List[Alert]):
+        body = json.dumps([a.to_dict() for a in alerts], ensure_ascii=False)
+        req = urllib.request.Request(
+            self.url,
+            data=body.encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST',
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout):
+            pass
+
+
+class AlertEngine:
+    """Évalue incrémentalement les règles sur des panels de prix successifs."""
+
+    def __init__(self, rules: Iterable[AlertRule] = (), sinks: Iterable = (),
+                 threshold_pct: float = 15.0, mode: str = 'moyenne'):
+        check_mode(mode)
+        self.threshold_pct = threshold_pct
+        self.mode = mode
+        self.sinks = list(sinks)
+        # Alertes non remises, par sink (même ordre que self.sinks)
+        self._pending: List[List[Alert]] = [[] for _ in self.sinks]
+        self._index: Dict[tuple, _LevelIndex] = {}
+        self._rule_count: Dict[str, int] = {}
+        # Dernière date évaluée et derniers scores connus par ETF
+        self._last_date: Dict[str, pd.Timestamp] = {}
+        self._scores: Dict[str, Dict[str, float]] = {}
+        for rule in rules:
+            self.add_rule(rule)
+
+    def add_rule(self, rule: AlertRule):
+        self._index.setdefault((rule.etf, rule.horizon), _LevelIndex()).add(rule)
+        self._rule_count[rule.etf] = self._rule_count.get(rule.etf, 0) + 1
+
+    def remove_rule(self, rule: AlertRule):
+        idx = self._index.get((rule.etf, rule.horizon))
+        if idx is None:
+            return
+        before = len(idx.rules)
+        idx.remove(rule)
+        if len(idx.rules) < before:
+            self._rule_count[rule.etf] -= 1
+
+    def scores(self, etf: str) -> Optional[Dict[str, float]]:
+        """Derniers scores connus de `etf` (horizons + TOTAL)."""
+        return self._scores.get(etf)
+
+    def evaluate(self, prices: pd.DataFrame) -> List[Alert]:
+        """
+        Rescore les ETF surveillés dont la dernière cotation est nouvelle
+        et retourne (et diffuse) les alertes déclenchées.
+
+        La première évaluation d'un ETF sert de référence et ne déclenche rien.
+        """
+        alerts: List[Alert] = []
+        for name in prices:
+            if not self._rule_count.get(name):
+                continue
+            s = prices[name].dropna()
+            if s.empty or self._last_date.get(name) == s.index[-1]:
+                continue
+            tf = timeframe_scores(s, self.threshold_pct, self.mode)
+            current = {lbl: score for lbl, (score, _a, _c) in tf.items()}
+            current[TOTAL] = sum(current.values())
+            previous = self._scores.get(name)
+            self._scores[name] = current
+            self._last_date[name] = s.index[-1]
+            if previous is None:
+                continue
+            date = str(pd.Timestamp(s.index[-1]).date())
+            for horizon, value in current.items():
+                idx = self._index.get((name, horizon))
+                if idx is None:
+                    continue
+                for rule in idx.crossed(previous[horizon], value):
+                    alerts.append(Alert(rule, previous[horizon], value, date))
+        self._dispatch(alerts)
+        return alerts
+
+    def _dispatch(self, alerts: List[Alert]):
+        """
+        Remet les alertes à chaque sink. Un sink en échec est journalisé et
+        garde ses alertes pour le tick suivant sans bloquer les autres.
+        """
+        for i, sink in enumerate(self.sinks):
+            batch = self._pending[i] + alerts
+            if not batch:
+                continue
+            try:
+                sink.send(batch)
+            except Exception:
+                logger.exception("Échec d'envoi de %d alerte(s) vers %r", len(batch), sink)
+                self._pending[i] = batch[-MAX_PENDING:]
+            else:
+                self._pending[i] = []
+
+
+def load_rules(path: str) -> List[AlertRule]:
+    """Lit une liste de règles JSON (objets etf/horizon/level/direction)."""
+    with open(path, encoding='utf-8') as f:
+        return [AlertRule(**item) for item in json.load(f)]
+
+
+def make_sink(spec: str):
+    """Construit un sink depuis `file:<chemin>` ou une URL http(s)."""
+    if spec.startswith(('http://', 'https://')):
+        return WebhookSink(spec)
+    if spec.startswith('file:'):
+        return FileSink(spec[len('file:'):])
+    raise ValueError(f"Sink inconnu : {spec}")
+
+
+def _fresh_prices() -> pd.DataFrame:
+    """Recharge les prix en vidant l'espace de cache « prix »."""
+    from .data_loader import load_prices
+    get_namespace('prix').clear()
+    return load_prices()
+
+
+def run(engine: AlertEngine, loader: Callable[[], pd.DataFrame] = _fresh_prices,
+        interval: float = 3600.0, iterations: Optional[int] = None):
+    """Boucle du service : charge les prix et évalue les règles à chaque tick."""
+    n = 0
+    while iterations is None or n < iterations:
+        try:
+            engine.evaluate(loader())
+        except Exception:
+            # Erreur de chargement ou de calcul : on retente au tick suivant
+            logger.exception("Échec de l'évaluation des alertes")
+        n += 1
+        if iterations is None or n < iterations:
+            time.sleep(interval)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Service d'alertes de score DCA")
+    parser.add_argument('--rules', required=True, help="Fichier JSON des règles")
+    parser.add_argument('--sink', action='append', default=[],
+                        help="file:<chemin> ou URL de webhook (répétable)")
+    parser.add_argument('--threshold', type=float, default=15.0,
+                        help="Seuil déviation (%%)")
+    parser.add_argument('--mode', default='moyenne', choices=list(SCORING_MODES.values()),
+                        help="Mode de scoring")
+    parser.add_argument('--interval', type=float, default=3600.0,
+                        help="Secondes entre deux évaluations")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    sinks = [make_sink(spec) for spec in args.sink] or [FileSink('alerts.jsonl')]
+    engine = AlertEngine(load_rules(args.rules), sinks, args.threshold, args.mode)
+    run(engine, interval=args.interval)
+
+
+if __name__ == '__main__':
+    main()
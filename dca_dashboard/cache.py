@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Cache borné en mémoire, partagé par tous les utilisateurs du serveur.
+
+Chaque espace de noms (prix, macro, scores, figures…) a sa taille maximale
+(entrées et octets), sa durée de vie et une éviction LRU. Les entrées
+portent des étiquettes (nom d'ETF, série macro) pour invalider une seule
+valeur et tout ce qui en dérive. Les valeurs sont partagées, pas copiées :
+les appelants ne doivent pas les modifier.
+"""
+import functools
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .constants import CACHE_LIMITS
+
+_MISSING = object()
+
+
+def sizeof(value: Any) -> int:
+    """Estimation de l'empreinte mémoire d'une valeur (octets)."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(getattr(value, 'nbytes', None), (int, np.integer)):
+        # Tableaux numpy et tables/tableaux Arrow
+        return int(value.nbytes)
+    if isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'expires', 'tags')
+
+    def __init__(self, value, size, expires, tags):
+        self.value = value
+        self.size = size
+        self.expires = expires
+        self.tags = tags
+
+
+class CacheNamespace:
+    """Espace de noms LRU borné en nombre d'entrées, en octets et en durée."""
+
+    def __init__(self, name: str, max_entries: int = 128,
+                 max_bytes: Optional[int] = None, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+
+    def get(self, key: Hashable, default=None, count: bool = True):
+        """Valeur associée à `key` si présente et non expirée."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires is not None and entry.expires <= self._clock():
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry.value
+
+    def set(self, key: Hashable, value, tags: Iterable[str] = ()):
+        """Stocke `value` puis évince les entrées les moins récentes si besoin."""
+        size = sizeof(value)
+        expires = None if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Valeur plus grosse que l'espace entier : non conservée
+                self.evictions += 1
+                return
+            self._entries[key] = _Entry(value, size, expires, frozenset(tags))
+            self.bytes += size
+            while len(self._entries) > self.max_entries or (
+                    self.max_bytes is not None and self.bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._drop(key)
+            return True
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Supprime les entrées étiquetées `tag` ; retourne leur nombre."""
+        with self._lock:
+            keys = [k for k, e in self._entries.items() if tag in e.tags]
+            for k in keys:
+                self._drop(k)
+            return len(keys)
+
+    def purge_expired(self) -> int:
+        """Supprime les entrées expirées ; retourne leur nombre."""
+        with self._lock:
+            now = self._clock()
+            keys = [k for k, e in self._entries.items()
+                    if e.expires is not None and e.expires <= now]
+            for k in keys:
+                self._drop(k)
+            self.expirations += len(keys)
+            return len(keys)
+
+    def entries(self) -> List[Tuple[Any, FrozenSet[str]]]:
+        """Valeurs non expirées et leurs étiquettes (sans toucher aux stats ni au LRU)."""
+        with self._lock:
+            now = self._clock()
+            return [(e.value, e.tags) for e in self._entries.values()
+                    if e.expires is None or e.expires > now]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'espace': self.name,
+            'entrées': len(self._entries),
+            'octets': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'évictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+_namespaces: Dict[str, CacheNamespace] = {}
+_registry_lock = threading.Lock()
+
+
+def get_namespace(name: str) -> CacheNamespace:
+    """Espace `name`, créé à la demande avec les limites de CACHE_LIMITS."""
+    with _registry_lock:
+        ns = _namespaces.get(name)
+        if ns is None:
+            ns = _namespaces[name] = CacheNamespace(name, **CACHE_LIMITS.get(name, {}))
+        return ns
+
+
+def invalidate_tag(tag: str) -> int:
+    """Invalide `tag` dans tous les espaces (donnée brute et dérivées)."""
+    return sum(ns.invalidate_tag(tag) for ns in list(_namespaces.values()))
+
+
+def stats() -> pd.DataFrame:
+    """Statistiques de chaque espace de noms."""
+    return pd.DataFrame([ns.stats() for ns in list(_namespaces.values())])
+
+
+def series_key(s: pd.Series) -> tuple:
+    """
+    Clé légère d'une série : nom, longueur, nombre de valeurs, dernière
+    date et dernière valeur renseignées (NaN ignorés).
+    """
+    last = s.last_valid_index()
+    if last is None:
+        return (s.name, len(s), 0, None, None)
+    return (s.name, len(s), int(s.count()), last, float(s.loc[last]))
+
+
+def cached(namespace: str, key: Optional[Callable[..., Hashable]] = None,
+           tags: Optional[Callable[..., Iterable[str]]] = None):
+    """
+    Mémoïse une fonction dans l'espace `namespace`.
+
+    La clé est `key(*args, **kwargs)`, ou les arguments eux-mêmes (qui
+    doivent alors être hachables) ; `tags(*args, **kwargs)` donne les
+    étiquettes de l'entrée. Les exceptions ne sont pas mises en cache.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            ns = get_namespace(namespace)
+            k = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            k = (func.__qualname__, k)
+            value = ns.get(k, _MISSING)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                ns.set(k, value, tags(*args, **kwargs) if tags else ())
+            return value
+        return wrapper
+    return decorator
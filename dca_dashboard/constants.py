@@ -22,9 +22,26 @@ TIMEFRAMES = {
     '5 ans': 365 * 5
 }
 
+# Règle de comparaison du dernier cours à chaque fenêtre
+SCORING_MODES = {
+    'Moyenne mobile': 'moyenne',
+    'Rang percentile': 'percentile',
+    'Médiane mobile': 'mediane',
+    'Moyenne exponentielle': 'ema'
+}
+
 MACRO_SERIES = {
     'CAPE10': 'CAPE',
     'Fed Funds Rate': 'FEDFUNDS',
     'CPI YoY': 'CPIAUCSL',
     'ECY': 'DGS10'
 }
+
+# Limites du cache mémoire par espace de noms (ttl en secondes)
+CACHE_LIMITS = {
+    'prix':    {'max_entries': 64,  'max_bytes': 64 * 2**20,  'ttl': 6 * 3600},
+    'macro':   {'max_entries': 32,  'max_bytes': 16 * 2**20,  'ttl': 24 * 3600},
+    'scores':  {'max_entries': 512, 'max_bytes': 64 * 2**20,  'ttl': 6 * 3600},
+    'figures': {'max_entries': 256, 'max_bytes': 128 * 2**20, 'ttl': 6 * 3600},
+    'export':  {'max_entries': 8,   'max_bytes': 64 * 2**20,  'ttl': 6 * 3600},
+}
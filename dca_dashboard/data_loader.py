@@ -1,45 +1,201 @@
 # -*- coding: utf-8 -*-
 """
 Chargement des données de prix et macro via yfinance et FRED.
+
+Chaque ticker et chaque série macro est mis en cache séparément
+(espaces « prix » et « macro », étiquetés par nom) pour pouvoir
+n'en recharger qu'un seul.
+
+La source est un « provider » choisi par la variable d'environnement
+DCA_DATA_PROVIDER :
+- live   : yfinance et FRED (par défaut)
+- record : comme live, en enregistrant chaque réponse dans DCA_DATA_DIR
+- replay : relit les enregistrements de DCA_DATA_DIR, sans réseau
 """
+import os
 import pandas as pd
-import yfinance as yf
 from datetime import datetime, timedelta
-from fredapi import Fred
-import streamlit as st
+from typing import Optional
+from urllib.parse import quote
+from .cache import cached, get_namespace, invalidate_tag
 from .constants import ETFS, MACRO_SERIES, TIMEFRAMES
 
-@st.cache_data
-def load_prices() -> pd.DataFrame:
-    """Télécharge les cours ajustés des ETFs sur la période nécessaire."""
+DEFAULT_DATA_DIR = os.path.join('data', 'recordings')
+
+
+class LiveProvider:
+    """Interroge yfinance et FRED (importés à la demande : inutiles en replay)."""
+
+    # FRED exige une clé d'API
+    needs_api_key = True
+
+    def prices(self, ticker: str, start: datetime, end: datetime) -> pd.Series:
+        import yfinance as yf
+        data = yf.download(ticker, start=start, end=end, progress=False)
+        s = data.get('Adj Close', data.get('Close'))
+        if s is None or s.empty:
+            # Échec non mis en cache : nouvelle tentative au prochain appel
+            raise ValueError(f"Aucune cotation pour {ticker}")
+        if isinstance(s, pd.DataFrame):
+            # yfinance récents : colonnes multi-index (champ, ticker)
+            s = s.iloc[:, 0]
+        return s
+
+    def macro(self, code: str, start: datetime, end: datetime, api_key: str) -> pd.Series:
+        from fredapi import Fred
+        return Fred(api_key=api_key).get_series(code, start, end)
+
+
+class ReplayProvider:
+    """
+    Relit les séries enregistrées par RecordProvider (un fichier Parquet
+    par série). Les séries sont servies telles qu'enregistrées, quelle que
+    soit la période demandée, pour des exécutions reproductibles.
+    """
+
+    needs_api_key = False
+
+    def __init__(self, directory: str = DEFAULT_DATA_DIR):
+        self.directory = directory
+
+    def _path(self, kind: str, code: str) -> str:
+        return os.path.join(self.directory, kind, quote(code, safe='') + '.parquet')
+
+    def _read(self, kind: str, code: str) -> pd.Series:
+        path = self._path(kind, code)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Aucun enregistrement pour {code} ({path})")
+        df = pd.read_parquet(path)
+        return df.iloc[:, 0]
+
+    def prices(self, ticker: str, start: datetime, end: datetime) -> pd.Series:
+        return self._read('prix', ticker)
+
+    def macro(self, code: str, start: datetime, end: datetime, api_key: str) -> pd.Series:
+        return self._read('macro', code)
+
+    def save(self, kind: str, code: str, s: pd.Series):
+        """Écrit `s` sous `kind` (prix ou macro) pour le code `code`."""
+        path = self._path(kind, code)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        s.rename('valeur').astype('float64').to_frame().to_parquet(path)
+
+
+class RecordProvider(ReplayProvider):
+    """Délègue à `upstream` (live par défaut) et enregistre chaque réponse."""
+
+    def __init__(self, directory: str = DEFAULT_DATA_DIR, upstream=None):
+        super().__init__(directory)
+        self.upstream = upstream or LiveProvider()
+
+    @property
+    def needs_api_key(self) -> bool:
+        return self.upstream.needs_api_key
+
+    def prices(self, ticker: str, start: datetime, end: datetime) -> pd.Series:
+        s = self.upstream.prices(ticker, start, end)
+        self.save('prix', ticker, s)
+        return s
+
+    def macro(self, code: str, start: datetime, end: datetime, api_key: str) -> pd.Series:
+        s = self.upstream.macro(code, start, end, api_key)
+        self.save('macro', code, s)
+        return s
+
+
+PROVIDERS = {'live': LiveProvider, 'record': RecordProvider, 'replay': ReplayProvider}
+
+_provider = None
+
+
+def get_provider():
+    """Provider courant, construit à la demande depuis l'environnement."""
+    global _provider
+    if _provider is None:
+        kind = os.environ.get('DCA_DATA_PROVIDER', 'live')
+        if kind not in PROVIDERS:
+            raise ValueError(f"Provider inconnu : {kind}")
+        if kind == 'live':
+            _provider = LiveProvider()
+        else:
+            _provider = PROVIDERS[kind](os.environ.get('DCA_DATA_DIR', DEFAULT_DATA_DIR))
+    return _provider
+
+
+def set_provider(provider: Optional[object]):
+    """Remplace le provider (None : relire l'environnement) et vide les caches de données."""
+    global _provider
+    _provider = provider
+    get_namespace('prix').clear()
+    get_namespace('macro').clear()
+
+
+@cached('prix', tags=lambda name: [name])
+def load_ticker(name: str) -> pd.Series:
+    """Télécharge les cours ajustés d'un ETF sur la période nécessaire."""
     end = datetime.today()
     # On prend la plus longue fenêtre définie dans TIMEFRAMES
     max_window = max(TIMEFRAMES.values())
     # On récupère 1.1× cette durée (en jours)
-    days = int(max_window * 1.1) 
+    days = int(max_window * 1.1)
     start = end - timedelta(days=days)
+    return get_provider().prices(ETFS[name], start, end).rename(name)
+
+def latest_session(now: Optional[datetime] = None) -> pd.Timestamp:
+    """Dernière séance attendue : aujourd'hui en semaine, sinon le vendredi précédent."""
+    today = pd.Timestamp(now or datetime.today()).normalize()
+    return today if today.dayofweek < 5 else today - pd.offsets.BDay(1)
+
+def invalidate_stale_prices(now: Optional[datetime] = None) -> list:
+    """
+    Invalide les ETF dont les cours en cache s'arrêtent avant la dernière
+    séance attendue, ainsi que leurs données dérivées ; retourne leurs noms.
+    """
+    session = latest_session(now)
+    stale = []
+    for s, tags in get_namespace('prix').entries():
+        last = s.last_valid_index()
+        if last is not None:
+            last = pd.Timestamp(last)
+            if last.tzinfo is not None:
+                last = last.tz_localize(None)
+        if last is None or last.normalize() < session:
+            stale.extend(tags)
+    for name in stale:
+        invalidate_tag(name)
+    return stale
+
+def load_prices() -> pd.DataFrame:
+    """Assemble les cours ajustés de tous les ETFs."""
     df = pd.DataFrame()
-    for name, ticker in ETFS.items():
+    for name in ETFS:
         try:
-            data = yf.download(ticker, start=start, end=end, progress=False)
-            df[name] = data.get('Adj Close', data.get('Close'))
+            df[name] = load_ticker(name)
         except Exception:
             df[name] = pd.Series(dtype=float)
     return df
 
-@st.cache_data
-def load_macro() -> pd.DataFrame:
-    """Récupère les séries macro de la Fed via FRED."""
-    api_key = st.secrets.get('FRED_API_KEY', None)
-    if not api_key:
-        return pd.DataFrame()
-    fred = Fred(api_key=api_key)
+@cached('macro', tags=lambda label, api_key: [label])
+def load_macro_series(label: str, api_key: str) -> pd.Series:
+    """Récupère une série macro de la Fed via FRED."""
     end = datetime.today()
     start = end - timedelta(days=365 * 6)
+    return get_provider().macro(MACRO_SERIES[label], start, end, api_key)
+
+def load_macro() -> pd.DataFrame:
+    """Récupère les séries macro de la Fed via FRED."""
+    provider = get_provider()
+    api_key = ''
+    if provider.needs_api_key:
+        # Import différé : streamlit n'est utile que pour lire la clé
+        import streamlit as st
+        api_key = st.secrets.get('FRED_API_KEY', None)
+        if not api_key:
+            return pd.DataFrame()
     df = pd.DataFrame()
-    for label, code in MACRO_SERIES.items():
+    for label in MACRO_SERIES:
         try:
-            df[label] = fred.get_series(code, start, end)
+            df[label] = load_macro_series(label, api_key)
         except Exception:
             df[label] = pd.Series(dtype=float)
     return df
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Export Apache Arrow du panel de prix, des scores et des allocations.
+
+Les tables sont construites une fois par jeu de cotations (cache « export »)
+puis servies par tranches sans copie : projection de colonnes via
+`Table.select`, plage de dates via `Table.slice` sur l'index trié gardé
+en cache avec chaque table. Les trois tables sont indexées par date.
+
+Utilisation en bibliothèque (`get_table`, `to_ipc_bytes`) ou en service
+Arrow Flight : ``python -m dca_dashboard.export --port 8815``.
+Le ticket Flight est un JSON : {"table": "prix", "columns": [...],
+"start": "2024-01-01", "end": null, "threshold_pct": 15, "mode": "moyenne"}.
+"""
+import argparse
+import json
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+try:
+    from pyarrow import flight
+except ImportError:  # pragma: no cover - Flight absent de certaines distributions
+    flight = None
+
+from .cache import cached, series_key
+from .constants import TIMEFRAMES
+from .data_loader import load_prices
+from .history import TOTAL_COL, WEIGHT_COL, score_frame
+
+TABLES = ('prix', 'scores', 'allocations')
+
+
+@cached(
+    'export',
+    key=lambda prices, threshold_pct, mode: (
+        tuple(series_key(prices[c]) for c in prices), threshold_pct, mode),
+)
+def build_tables(prices: pd.DataFrame, threshold_pct: float = 15.0,
+                 mode: str = 'moyenne') -> Dict[str, Tuple[pa.Table, np.ndarray]]:
+    """
+    Tables Arrow `prix`, `scores` et `allocations` d'un panel de prix, chacune
+    avec l'index trié de sa colonne `date`. Scores et allocations sont
+    quotidiens, comme l'historique matérialisé (voir history.score_frame).
+    """
+    panel = prices.sort_index()
+    panel.index.name = 'date'
+    daily = score_frame(panel, threshold_pct, mode=mode)
+    daily['etf'] = daily['etf'].astype(str)
+    frames = {
+        'prix': panel.reset_index(),
+        'scores': daily[['date', 'etf', *TIMEFRAMES, TOTAL_COL]],
+        'allocations': daily[['date', 'etf', TOTAL_COL, WEIGHT_COL]].rename(
+            columns={TOTAL_COL: 'score', WEIGHT_COL: 'poids'}),
+    }
+    return {
+        name: (pa.Table.from_pandas(df, preserve_index=False),
+               df['date'].to_numpy(dtype='datetime64[ns]'))
+        for name, df in frames.items()
+    }
+
+
+def project(table: pa.Table, columns: Optional[Iterable[str]] = None,
+            start=None, end=None, dates: Optional[np.ndarray] = None) -> pa.Table:
+    """
+    Restreint `table` aux colonnes demandées et à la plage [start, end] de
+    sa colonne `date` triée. `dates` est l'index de cette colonne (fourni
+    par build_tables) ; sans lui, il est reconstruit, ce qui le copie.
+    La table elle-même n'est pas copiée.
+    """
+    if start is not None or end is not None:
+        if 'date' not in table.column_names:
+            raise ValueError("Plage de dates demandée sur une table sans colonne date")
+        if dates is None:
+            dates = table.column('date').to_numpy()
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), 'left'))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), 'right'))
+        table = table.slice(lo, max(hi - lo, 0))
+    if columns is not None:
+        columns = list(columns)
+        # Les clés (date, etf) restent toujours présentes
+        keys = [k for k in ('date', 'etf') if k in table.column_names and k not in columns]
+        table = table.select(keys + columns)
+    return table
+
+
+def get_table(name: str, columns: Optional[Iterable[str]] = None, start=None, end=None,
+              threshold_pct: float = 15.0, mode: str = 'moyenne',
+              prices: Optional[pd.DataFrame] = None) -> pa.Table:
+    """Table `name` (voir TABLES), projetée sur colonnes et dates."""
+    if name not in TABLES:
+        raise KeyError(f"Table inconnue : {name}")
+    if prices is None:
+        prices = load_prices()
+    table, dates = build_tables(prices, threshold_pct, mode)[name]
+    return project(table, columns, start, end, dates)
+
+
+def to_ipc_bytes(table: pa.Table) -> bytes:
+    """Sérialise `table` au format Arrow IPC (stream)."""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _parse_ticket(raw: bytes) -> dict:
+    req = json.loads(raw.decode('utf-8'))
+    return {
+        'name': req['table'],
+        'columns': req.get('columns'),
+        'start': req.get('start'),
+        'end': req.get('end'),
+        'threshold_pct': float(req.get('threshold_pct', 15.0)),
+        'mode': req.get('mode', 'moyenne'),
+    }
+
+
+if flight is not None:
+    class ExportFlightServer(flight.FlightServerBase):
+        """Serveur Flight : un ticket JSON par table projetée."""
+
+        def __init__(self, location: str = 'grpc://127.0.0.1:8815', loader=load_prices, **kwargs):
+            super().__init__(location, **kwargs)
+            self._loader = loader
+
+        def _table(self, raw: bytes) -> pa.Table:
+            req = _parse_ticket(raw)
+            return get_table(prices=self._loader(), **req)
+
+        def list_flights(self, context, criteria):
+            for name in TABLES:
+                yield self.get_flight_info(
+                    context, flight.FlightDescriptor.for_command(json.dumps({'table': name})))
+
+        def get_flight_info(self, context, descriptor):
+            table = self._table(descriptor.command)
+            endpoint = flight.FlightEndpoint(descriptor.command, [])
+            return flight.FlightInfo(table.schema, descriptor, [endpoint],
+                                     table.num_rows, table.nbytes)
+
+        def do_get(self, context, ticket):
+            try:
+                table = self._table(ticket.ticket)
+            except (KeyError, ValueError) as exc:
+                raise flight.FlightServerError(str(exc))
+            return flight.RecordBatchStream(table)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Service Arrow Flight du dashboard DCA")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="Interface d'écoute (locale par défaut, serveur non authentifié)")
+    parser.add_argument('--port', type=int, default=8815)
+    args = parser.parse_args(argv)
+    if flight is None:
+        raise ImportError("Le service nécessite pyarrow avec le module flight")
+    server = ExportFlightServer(f'grpc://{args.host}:{args.port}')
+    server.serve()
+
+
+if __name__ == '__main__':
+    main()
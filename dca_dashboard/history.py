@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Historique matérialisé des scores : un enregistrement par (date, ETF)
+avec le score de chaque horizon, le score total et la pondération
+recommandée, stocké en fichiers Parquet.
+
+Le premier `update` calcule tout l'historique disponible ; les suivants
+n'ajoutent que les dates postérieures à la dernière date stockée de chaque
+ETF. Un ETF absent du magasin (téléchargement en échec, ajout à ETFS) ou
+en retard est rattrapé : les dates concernées sont recalculées pour tous
+les ETF, afin que les pondérations restent cohérentes.
+"""
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .constants import TIMEFRAMES
+from .scoring import check_mode, rolling_deviations, score_array
+
+DEFAULT_ROOT = os.path.join('data', 'score_history')
+TOTAL_COL = 'Total'
+WEIGHT_COL = 'Poids'
+# Au-delà, les fichiers d'ajout sont fusionnés en un seul
+MAX_PARTS = 32
+
+# Un verrou par magasin : les sessions Streamlit d'un même serveur
+# peuvent mettre à jour le même répertoire en parallèle
+_locks: Dict[str, threading.RLock] = {}
+_locks_guard = threading.Lock()
+
+
+def _store_lock(path: str) -> threading.RLock:
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(path), threading.RLock())
+
+
+def score_frame(prices: pd.DataFrame, threshold_pct: float,
+                since: Optional[pd.Timestamp] = None,
+                mode: str = 'moyenne') -> pd.DataFrame:
+    """
+    Scores quotidiens de tous les ETF au format long
+    (date, etf, horizons…, Total, Poids), limités aux dates > `since`.
+    """
+    names, indexes, scores = [], [], []
+    for name, series in prices.items():
+        s = series.dropna()
+        if s.empty:
+            continue
+        dev = rolling_deviations(s, mode)
+        names.append(name)
+        indexes.append(s.index)
+        scores.append(np.column_stack([score_array(dev[lbl], threshold_pct) for lbl in TIMEFRAMES]))
+    if not names:
+        return pd.DataFrame(columns=['date', 'etf', *TIMEFRAMES, TOTAL_COL, WEIGHT_COL])
+
+    # Pondération recommandée date par date (même règle que recommended_weights).
+    # Un ETF sans cotation ce jour-là (jour férié) garde son dernier score,
+    # comme sur le dashboard, au lieu de sortir de la répartition
+    totals = [sc.sum(axis=1) for sc in scores]
+    tot = pd.DataFrame(
+        {name: pd.Series(total, index=idx) for name, total, idx in zip(names, totals, indexes)}
+    ).ffill()
+    t = tot.to_numpy()
+    shift = np.clip(-np.nanmin(t, axis=1), 0, None)
+    adj = t + shift[:, None]
+    denom = np.nansum(adj, axis=1)
+    denom[denom == 0] = 1
+    weights = adj / denom[:, None] * 100
+
+    # Assemblage en tableaux numpy, une seule DataFrame à la fin
+    dates, etfs, values = [], [], []
+    for j, (name, idx, sc, total) in enumerate(zip(names, indexes, scores, totals)):
+        keep = slice(None) if since is None else idx > since
+        w = weights[tot.index.get_indexer(idx), j]
+        dates.append(idx[keep])
+        etfs.append(np.full(len(dates[-1]), name, dtype=object))
+        values.append(np.column_stack([sc, total, w])[keep])
+    date = np.concatenate([d.to_numpy() for d in dates])
+    etf = np.concatenate(etfs)
+    order = np.lexsort((etf, date))
+    out = pd.DataFrame(
+        np.concatenate(values)[order].astype(np.float32),
+        columns=[*TIMEFRAMES, TOTAL_COL, WEIGHT_COL],
+    )
+    out.insert(0, 'etf', pd.Categorical(etf[order]))
+    out.insert(0, 'date', date[order])
+    return out
+
+
+class ScoreHistory:
+    """Magasin Parquet des scores pour un mode et un seuil de déviation donnés."""
+
+    def __init__(self, root: str = DEFAULT_ROOT, threshold_pct: float = 15.0,
+                 mode: str = 'moyenne'):
+        check_mode(mode)
+        self.threshold_pct = threshold_pct
+        self.mode = mode
+        self.path = os.path.join(root, mode, f'seuil_{threshold_pct:g}')
+        self._lock = _store_lock(self.path)
+
+    def _parts(self) -> List[str]:
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(
+            os.path.join(self.path, f)
+            for f in os.listdir(self.path) if f.endswith('.parquet')
+        )
+
+    @staticmethod
+    def _part_end(path: str) -> pd.Timestamp:
+        """Dernière date d'un fichier, lue dans son nom (part-<début>-<fin>)."""
+        return pd.Timestamp(os.path.basename(path)[:-len('.parquet')].split('-')[-1])
+
+    def last_dates(self) -> Dict[str, pd.Timestamp]:
+        """Dernière date stockée de chaque ETF."""
+        parts = self._parts()
+        if not parts:
+            return {}
+        df = pd.concat([pd.read_parquet(p, columns=['date', 'etf']) for p in parts])
+        last = df.groupby(df['etf'].astype(str), observed=True)['date'].max()
+        return last.to_dict()
+
+    def _write(self, df: pd.DataFrame) -> str:
+        """
+        Écrit `df` dans un fichier nommé d'après ses dates et retourne son
+        chemin. L'écriture passe par un fichier temporaire renommé ensuite :
+        en cas d'échec, les fichiers existants restent intacts.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        first, last = df['date'].min(), df['date'].max()
+        path = os.path.join(self.path, f"part-{first:%Y%m%d}-{last:%Y%m%d}.parquet")
+        tmp = path + '.tmp'
+        try:
+            df.to_parquet(tmp, index=False)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        os.replace(tmp, path)
+        return path
+
+    def update(self, prices: pd.DataFrame) -> int:
+        """
+        Ajoute les dates nouvelles de `prices` ; retourne le nombre net de
+        lignes ajoutées.
+        """
+        with self._lock:
+            return self._update(prices)
+
+    def _update(self, prices: pd.DataFrame) -> int:
+        stored = self.last_dates()
+        # Date à partir de laquelle recalculer : la plus ancienne dernière
+        # date parmi les ETF ayant des cotations non encore stockées
+        cutoff, pending = None, False
+        for name, series in prices.items():
+            last = series.last_valid_index()
+            if last is None:
+                continue
+            seen = stored.get(name)
+            if seen is not None and last <= seen:
+                continue
+            if seen is None:
+                cutoff, pending = None, True
+                break
+            cutoff = seen if not pending else min(cutoff, seen)
+            pending = True
+        if not pending:
+            return 0
+
+        # Fichiers contenant des dates à recalculer : on ne garde que
+        # leurs lignes antérieures ou égales à cutoff
+        affected = [p for p in self._parts() if cutoff is None or self._part_end(p) > cutoff]
+        kept = []
+        dropped = 0
+        for p in affected:
+            df = pd.read_parquet(p)
+            keep = df.iloc[0:0] if cutoff is None else df[df['date'] <= cutoff]
+            dropped += len(df) - len(keep)
+            kept.append(keep)
+        new = score_frame(prices, self.threshold_pct, cutoff, self.mode)
+        frames = [df for df in kept if not df.empty]
+        if not new.empty:
+            frames.append(new)
+        written = None
+        if frames:
+            out = pd.concat(frames, ignore_index=True)
+            out['etf'] = out['etf'].astype(str).astype('category')
+            written = self._write(out.sort_values(['date', 'etf']).reset_index(drop=True))
+        # Les anciens fichiers ne sont supprimés qu'une fois le nouveau en place
+        for p in affected:
+            if p != written:
+                os.remove(p)
+        if len(self._parts()) > MAX_PARTS:
+            self.compact()
+        return len(new) - dropped
+
+    def compact(self):
+        """Fusionne tous les fichiers d'ajout en un seul."""
+        with self._lock:
+            parts = self._parts()
+            if len(parts) < 2:
+                return
+            df = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+            written = self._write(df)
+            for p in parts:
+                if p != written:
+                    os.remove(p)
+
+    def query(self, start=None, end=None, etfs: Optional[Iterable[str]] = None,
+              columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Lignes stockées entre `start` et `end` (inclus), filtrables par ETF."""
+        cols = None if columns is None else ['date', 'etf', *columns]
+        filters = []
+        if start is not None:
+            filters.append(('date', '>=', pd.Timestamp(start)))
+        if end is not None:
+            filters.append(('date', '<=', pd.Timestamp(end)))
+        if etfs is not None:
+            filters.append(('etf', 'in', list(etfs)))
+        with self._lock:
+            parts = self._parts()
+            if not parts:
+                return pd.DataFrame(columns=cols or ['date', 'etf', *TIMEFRAMES, TOTAL_COL, WEIGHT_COL])
+            frames = [pd.read_parquet(p, columns=cols, filters=filters or None) for p in parts]
+        df = pd.concat(frames, ignore_index=True)
+        df['etf'] = df['etf'].astype(str)
+        return df
@@ -11,3 +11,11 @@ def make_timeseries_fig(series: pd.Series, period_days: int) -> px.line:
     fig = px.line(df, height=200)
     fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), showlegend=False)
     return fig
+
+def make_score_history_fig(history: pd.Series, period_days: int) -> px.line:
+    """Retourne l'évolution du score total d'un ETF (indexé par date) sur les days derniers."""
+    df = history.tail(period_days)
+    fig = px.line(df, height=120, line_shape='hv')
+    fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), showlegend=False,
+                      yaxis_title=None, xaxis_title=None)
+    return fig
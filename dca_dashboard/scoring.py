@@ -2,8 +2,13 @@
 """
 Fonctions de calcul de performance relative et mapping en score/affichage.
 """
+import numpy as np
 import pandas as pd
-from typing import Tuple
+from typing import Dict, Mapping, Optional, Tuple
+from .constants import SCORING_MODES, TIMEFRAMES
+
+# Style par défaut d'un horizon sans donnée
+EMPTY_STYLE = (0.0, '↓', 'crimson')
 
 def pct_change(s: pd.Series) -> float:
     """% de variation entre les deux dernières valeurs."""
@@ -30,3 +35,136 @@ def score_and_style(diff: float, threshold_pct: float) -> Tuple[float, str, str]
         return -0.5, '↗', '#FFB74D'    # orange pastel
     else:
         return -1.0, '↑', '#E57373'    # rouge pastel
+
+
+def _ema_halflife(w: int) -> pd.Timedelta:
+    """Demi-vie équivalente à une EMA de portée w jours (span)."""
+    return pd.Timedelta(days=w * np.log(2) / 2)
+
+
+def check_mode(mode: str):
+    """Lève ValueError si `mode` n'est pas un mode de SCORING_MODES."""
+    if mode not in SCORING_MODES.values():
+        raise ValueError(f"Mode de scoring inconnu : {mode}")
+
+
+def _ema_last(s: pd.Series) -> Dict[str, float]:
+    """
+    EMA au dernier point pour chaque horizon, avec les poids de
+    `s.ewm(halflife=_ema_halflife(w), times=s.index)` : 0.5^(âge / demi-vie).
+    Les âges sont calculés une seule fois pour tous les horizons.
+    """
+    day = pd.Timedelta(days=1)
+    age = ((s.index[-1] - s.index) / day).to_numpy(dtype=float)
+    halflives = np.array([_ema_halflife(w) / day for w in TIMEFRAMES.values()])
+    weights = np.exp2(-age[None, :] / halflives[:, None])
+    refs = weights @ s.to_numpy(dtype=float) / weights.sum(axis=1)
+    return dict(zip(TIMEFRAMES, refs))
+
+
+def window_deviation(window: pd.Series, last: float, mode: str = 'moyenne') -> float:
+    """
+    Écart du dernier cours à une fenêtre selon le mode :
+    - moyenne / mediane : écart relatif à la moyenne / médiane
+    - percentile : rang percentile du dernier cours moins 0.5
+    """
+    if mode == 'percentile':
+        v = window.to_numpy()
+        below = np.count_nonzero(v < last)
+        equal = np.count_nonzero(v == last)
+        # Rang moyen des ex aequo, centré : une fenêtre d'un point vaut 0
+        return (below + equal / 2) / len(v) - 0.5
+    if mode == 'mediane':
+        # np.median sélectionne sans trier entièrement la fenêtre
+        m = float(np.median(window.to_numpy()))
+    else:
+        m = window.mean()
+    return (last - m) / m
+
+
+def timeframe_details(s: pd.Series, threshold_pct: float,
+                      mode: str = 'moyenne') -> Dict[str, Tuple[float, float, str, str]]:
+    """
+    Moyenne de la fenêtre, score, flèche et couleur pour chaque horizon.
+
+    Compare la dernière valeur de la série (sans NaN, triée) à chaque fenêtre
+    se terminant à la dernière date, selon `mode` (voir SCORING_MODES).
+    Les fenêtres sont des tranches de la série, sans copie ni masque.
+    """
+    check_mode(mode)
+    if len(s) < 1:
+        return {lbl: (float('nan'), *EMPTY_STYLE) for lbl in TIMEFRAMES}
+    last = s.iloc[-1]
+    ema = _ema_last(s) if mode == 'ema' else None
+    details = {}
+    for lbl, w in TIMEFRAMES.items():
+        start = s.index.searchsorted(s.index[-1] - pd.Timedelta(days=w), side='left')
+        window = s.iloc[start:]
+        # Moyenne affichée sur la carte, quel que soit le mode
+        m = window.mean()
+        if mode == 'ema':
+            diff = (last - ema[lbl]) / ema[lbl]
+        elif mode == 'moyenne':
+            diff = (last - m) / m
+        else:
+            diff = window_deviation(window, last, mode)
+        details[lbl] = (float(m), *score_and_style(diff, threshold_pct))
+    return details
+
+
+def timeframe_scores(s: pd.Series, threshold_pct: float,
+                     mode: str = 'moyenne') -> Dict[str, Tuple[float, str, str]]:
+    """Score, flèche et couleur pour chaque horizon de TIMEFRAMES."""
+    return {lbl: d[1:] for lbl, d in timeframe_details(s, threshold_pct, mode).items()}
+
+
+def score_array(diff, threshold_pct: float) -> np.ndarray:
+    """Version vectorisée du score de `score_and_style` (NaN -> 0)."""
+    d = np.asarray(diff, dtype=float)
+    t = threshold_pct / 100.0
+    scores = np.select(
+        [d <= -t, d < 0, d == 0, d < t, d >= t],
+        [1.0, 0.5, 0.0, -0.5, -1.0],
+        default=0.0,
+    )
+    return scores
+
+
+def rolling_deviations(s: pd.Series, mode: str = 'moyenne') -> pd.DataFrame:
+    """
+    Écart de chaque cours à chaque horizon, fenêtre [date - w jours, date]
+    comme dans `timeframe_scores`.
+
+    Les modes médiane et percentile s'appuient sur les fenêtres glissantes
+    de pandas (skiplist, mise à jour en O(log w)) au lieu de trier chaque fenêtre.
+    """
+    check_mode(mode)
+    out = {}
+    for lbl, w in TIMEFRAMES.items():
+        if mode == 'ema':
+            m = s.ewm(halflife=_ema_halflife(w), times=s.index).mean()
+            out[lbl] = (s - m) / m
+            continue
+        roll = s.rolling(f'{w}D', closed='both')
+        if mode == 'percentile':
+            # rank(pct) = rang moyen / n ; recentré comme window_deviation
+            out[lbl] = roll.rank(pct=True) - 0.5 / roll.count() - 0.5
+            continue
+        m = roll.median() if mode == 'mediane' else roll.mean()
+        out[lbl] = (s - m) / m
+    return pd.DataFrame(out, index=s.index)
+
+
+def recommended_weights(raw_scores: Mapping[str, float],
+                        origine: Optional[Mapping[str, float]] = None) -> Dict[str, float]:
+    """
+    Pondération recommandée (%) : scores décalés pour être positifs,
+    multipliés par la pondération d'origine (égale par défaut), normalisés à 100.
+    """
+    min_score = min(raw_scores.values(), default=0.0)
+    shift = -min_score if min_score < 0 else 0.0
+    if origine is None:
+        origine = {n: 1.0 for n in raw_scores}
+    weighted = {n: origine.get(n, 0.0) * (v + shift) for n, v in raw_scores.items()}
+    tot = sum(weighted.values()) or 1
+    return {n: w / tot * 100 for n, w in weighted.items()}
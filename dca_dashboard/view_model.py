@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Préparation des cartes ETF : un enregistrement compact par ETF, calculé
+en une seule passe, que tout le code d'affichage lit.
+"""
+import math
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from .constants import MACRO_SERIES, TIMEFRAMES
+from .scoring import pct_change, timeframe_details
+
+MacroSummary = Tuple[Tuple[str, Optional[float]], ...]
+
+
+def score_to_colors(score: float) -> tuple[str, str]:
+    """Retourne couleur pleine et fond à 50% selon le score."""
+    if score > 0:
+        return "green", "rgba(0,128,0,0.5)"
+    elif score < 0:
+        return "crimson", "rgba(220,20,60,0.5)"
+    else:
+        return "gray", "rgba(128,128,128,0.5)"
+
+
+def macro_summary(macro_df: pd.DataFrame) -> MacroSummary:
+    """Dernière valeur de chaque indicateur macro (None si indisponible)."""
+    items = []
+    for lbl in MACRO_SERIES:
+        s = macro_df[lbl].dropna() if lbl in macro_df else None
+        items.append((lbl, float(s.iloc[-1]) if s is not None and not s.empty else None))
+    return tuple(items)
+
+
+class EtfView:
+    """
+    Données d'une carte ETF. Les champs par horizon (means, scores,
+    arrows, colors) sont des tuples alignés sur l'ordre de TIMEFRAMES ;
+    `history` est le score total historique indexé par date (ou None).
+    """
+    __slots__ = (
+        'name', 'series', 'last', 'delta', 'means', 'scores', 'arrows',
+        'colors', 'total', 'border_color', 'bg_color', 'macro', 'history',
+    )
+
+    def __init__(self, name: str, series: pd.Series, threshold_pct: float,
+                 mode: str = 'moyenne', macro: MacroSummary = (),
+                 history: Optional[pd.Series] = None):
+        self.name = name
+        self.series = series
+        self.history = history
+        details = timeframe_details(series, threshold_pct, mode)
+        self.means, self.scores, self.arrows, self.colors = (
+            tuple(col) for col in zip(*(details[lbl] for lbl in TIMEFRAMES))
+        )
+        self.last = float(series.iloc[-1]) if len(series) else math.nan
+        self.delta = pct_change(series)
+        self.total = sum(self.scores)
+        self.border_color, self.bg_color = score_to_colors(self.total)
+        self.macro = macro
+
+    @property
+    def empty(self) -> bool:
+        return len(self.series) == 0
+
+    def badges(self):
+        """(horizon, score, flèche, couleur) pour chaque horizon."""
+        return zip(TIMEFRAMES, self.scores, self.arrows, self.colors)
+
+
+def build_view(series: pd.Series, threshold_pct: float, mode: str = 'moyenne',
+               macro: MacroSummary = (), history: Optional[pd.Series] = None) -> EtfView:
+    """Carte d'un ETF à partir de sa colonne de prix (un seul dropna)."""
+    return EtfView(series.name, series.dropna(), threshold_pct, mode, macro, history)
+
+
+def history_by_etf(history: pd.DataFrame) -> Dict[str, pd.Series]:
+    """Score total historique de chaque ETF, indexé par date (un seul groupby)."""
+    return {
+        name: group.set_index('date')['Total']
+        for name, group in history.groupby('etf', sort=False)
+    }
@@ -5,21 +5,44 @@ Dashboard DCA ETF avec cartes « full-block » encadrées.
 
 import streamlit as st
 import pandas as pd
-from dca_dashboard.constants       import ETFS, TIMEFRAMES, MACRO_SERIES
-from dca_dashboard.data_loader     import load_prices, load_macro
-from dca_dashboard.scoring         import pct_change, score_and_style
-from dca_dashboard.plotting        import make_timeseries_fig
+from dca_dashboard.constants       import ETFS, TIMEFRAMES, MACRO_SERIES, SCORING_MODES
+from dca_dashboard.data_loader     import load_prices, load_macro, invalidate_stale_prices
+from dca_dashboard.scoring         import recommended_weights
+from dca_dashboard.view_model      import EtfView, build_view, history_by_etf, macro_summary
+from dca_dashboard.history         import ScoreHistory
+from dca_dashboard.plotting        import make_timeseries_fig, make_score_history_fig
 from dca_dashboard.streamlit_utils import inject_css, begin_card, end_card
+from dca_dashboard                 import cache
+from dca_dashboard.cache           import cached, series_key
 
 
-def score_to_colors(score: float) -> tuple[str, str]:
-    """Retourne couleur pleine et fond à 50% selon le score."""
-    if score > 0:
-        return "green", "rgba(0,128,0,0.5)"
-    elif score < 0:
-        return "crimson", "rgba(220,20,60,0.5)"
-    else:
-        return "gray", "rgba(128,128,128,0.5)"
+@cached("scores", tags=lambda *_a: list(ETFS))
+def load_score_history(threshold_pct: float, mode: str, last_date) -> pd.DataFrame:
+    """Met à jour l'historique des scores puis le relit (une fois par cotation)."""
+    store = ScoreHistory(threshold_pct=threshold_pct, mode=mode)
+    store.update(load_prices())
+    return store.query()
+
+
+@cached(
+    "scores",
+    key=lambda s, threshold_pct, mode, macro, history: (
+        series_key(s), threshold_pct, mode, macro, history is not None),
+    tags=lambda s, *_a: [s.name],
+)
+def etf_view(s: pd.Series, threshold_pct: float, mode: str, macro, history) -> EtfView:
+    """Carte d'un ETF, recalculée seulement sur nouvelle cotation."""
+    return build_view(s, threshold_pct, mode, macro, history)
+
+
+@cached(
+    "figures",
+    key=lambda s, period: (series_key(s), period),
+    tags=lambda s, _p: [s.name],
+)
+def price_fig(s: pd.Series, period: int):
+    """Graphique des cours d'un ETF (mis en cache par cotation et période)."""
+    return make_timeseries_fig(s, period)
 
 # --- CONFIGURATION DE LA PAGE ---
 # Définition du titre et de la mise en page générale (large avec barre latérale ouverte).
@@ -34,11 +57,24 @@ inject_css()
 # --- SIDEBAR DE RÉGLAGES ---
 # Zone de contrôle à gauche permettant de modifier les paramètres de l'interface.
 st.sidebar.header("Paramètres de rééquilibrage")
-# Bouton pour purger les données mises en cache et forcer un rechargement.
+# Bouton de rechargement des cours périmés : seuls les ETF dont la dernière
+# cotation précède la dernière séance attendue sont retéléchargés.
 if st.sidebar.button("🔄 Rafraîchir"):
-    st.cache_data.clear()
+    invalidate_stale_prices()
 # Curseur définissant le seuil de déclenchement des indicateurs de tendance.
 threshold_pct = st.sidebar.slider("Seuil déviation (%)", 5, 30, 15, 5)
+# Règle de comparaison du dernier cours à chaque fenêtre (moyenne, percentile…).
+mode_lbl = st.sidebar.selectbox(
+    "Mode de scoring",
+    list(SCORING_MODES.keys()),
+    index=0,
+    help=(
+        "En mode « Rang percentile », le seuil de déviation est un écart en points "
+        "de percentile au rang médian : à 15 %, un cours sous le 35e percentile "
+        "de la fenêtre obtient +1, au-dessus du 65e −1."
+    ),
+)
+scoring_mode = SCORING_MODES[mode_lbl]
 # Sélecteur global de période pour les graphiques des cartes ETF.
 period_lbl = st.sidebar.selectbox(
     "Période des graphiques",
@@ -46,6 +82,8 @@ period_lbl = st.sidebar.selectbox(
     index=3,
 )
 period = TIMEFRAMES[period_lbl]
+# Affichage optionnel de l'historique des scores sous chaque graphique.
+show_history = st.sidebar.checkbox("Historique des scores", value=True)
 # Exemple d'information additionnelle libre dans la barre latérale.
 st.sidebar.write("VIX non disponible")
 
@@ -54,36 +92,17 @@ st.sidebar.write("VIX non disponible")
 prices   = load_prices()
 macro_df = load_macro()
 
-# --- CALCUL DES SCORES (PAR PÉRIODE) & ALLOCATIONS ---
-raw_scores   = {}
-tf_scores    = {}
-for name, series in prices.items():
-    s = series.dropna()
-    tf_scores[name] = {}
-    if len(s) < 1:
-        raw_scores[name] = 0.0
-        # Valeurs par défaut si aucune donnée
-        for lbl in TIMEFRAMES:
-            tf_scores[name][lbl] = (0.0, "↓", "crimson")
-        continue
-
-    last  = s.iloc[-1]
-    total = 0.0
-    for lbl, w in TIMEFRAMES.items():
-        window = s[s.index >= (s.index[-1] - pd.Timedelta(days=w))]
-        if not window.empty:
-            m    = window.mean()
-            diff = (last - m) / m
-            score, arrow, bg = score_and_style(diff, threshold_pct)
-            total += score
-        else:
-            score, arrow, bg = 0.0, "↓", "crimson"
-        tf_scores[name][lbl] = (score, arrow, bg)
-    raw_scores[name] = total
-
-min_score   = min(raw_scores.values(), default=0.0)
-shift       = -min_score if min_score < 0 else 0.0
-adj_scores  = {k: v + shift for k, v in raw_scores.items()}
+# --- PRÉPARATION DES CARTES (SCORES PAR PÉRIODE) & ALLOCATIONS ---
+# Une passe par ETF ; tout l'affichage lit ensuite ces enregistrements.
+macro      = macro_summary(macro_df)
+# Historique des scores découpé par ETF une seule fois et rattaché à chaque carte
+score_history = load_score_history(threshold_pct, scoring_mode, prices.index.max()) if show_history else None
+histories  = history_by_etf(score_history) if score_history is not None else {}
+views      = [
+    etf_view(series, threshold_pct, scoring_mode, macro, histories.get(name))
+    for name, series in prices.items()
+]
+raw_scores = {v.name: v.total for v in views}
 
 # --- AFFICHAGE SIDEBAR PONDÉRATION ---
 # Initialisation des valeurs « Origine » en session pour pouvoir les modifier.
@@ -92,9 +111,7 @@ if "origine_pcts" not in st.session_state:
     st.session_state["origine_pcts"] = {name: default_pct for name in ETFS}
 if "reco_pcts" not in st.session_state:
     # Première recommandation basée sur les scores ajustés et la pondération d'origine.
-    weighted = {n: st.session_state["origine_pcts"][n] * adj_scores.get(n, 0.0) for n in ETFS}
-    tot = sum(weighted.values()) or 1
-    st.session_state["reco_pcts"] = {n: weighted[n] / tot * 100 for n in ETFS}
+    st.session_state["reco_pcts"] = recommended_weights(raw_scores, st.session_state["origine_pcts"])
 
 
 def redistribute(weights: dict[str, float], changed: str, new_val: float) -> dict[str, float]:
@@ -169,9 +186,7 @@ if changed_orig:
     key = changed_orig[0]
     st.session_state["origine_pcts"][key] = orig_inputs[key]
     # Recalcul de la colonne recommandée à partir des nouvelles valeurs d'origine
-    weighted = {n: st.session_state["origine_pcts"][n] * adj_scores.get(n, 0.0) for n in ETFS}
-    tot = sum(weighted.values()) or 1
-    st.session_state["reco_pcts"] = {n: weighted[n] / tot * 100 for n in ETFS}
+    st.session_state["reco_pcts"] = recommended_weights(raw_scores, st.session_state["origine_pcts"])
     st.experimental_rerun()
 
 changed_reco = [n for n in ETFS if abs(reco_inputs[n] - prev_reco[n]) > 1e-9]
@@ -194,40 +209,41 @@ if abs(tot_orig - 100) > 0.01:
 if abs(tot_reco - 100) > 0.01:
     st.sidebar.error(f"Reco total {tot_reco:.2f}% (Δ {tot_reco-100:+.2f}%)")
 
+# --- ÉTAT DU CACHE ---
+# Invalidation ciblée d'un ETF ou d'une série macro, et statistiques par espace.
+with st.sidebar.expander("Cache"):
+    targets = st.multiselect("Recharger", list(ETFS) + list(MACRO_SERIES))
+    if st.button("Invalider la sélection") and targets:
+        for tag in targets:
+            cache.invalidate_tag(tag)
+        st.experimental_rerun()
+    st.dataframe(cache.stats(), hide_index=True)
+
 # --- AFFICHAGE PRINCIPAL ---
 st.title("Dashboard DCA ETF")
 
 # Deux colonnes pour présenter les cartes ETF côte à côte.
 cols   = st.columns(2)
-# Pré-calcul des variations récentes pour l'affichage en pourcentage.
-deltas = {n: pct_change(prices[n].dropna()) for n in prices}
 
-for idx, (name, series) in enumerate(prices.items()):
-    data = series.dropna()
-    if data.empty:
+for idx, view in enumerate(views):
+    if view.empty:
         continue
 
-    # Valeur & variation affichées en haut de la carte
-    last       = data.iloc[-1]
-    delta      = deltas.get(name, 0.0)
-    perf_color = "green" if delta >= 0 else "crimson"
-
+    # Variation affichée en haut de la carte
+    perf_color = "green" if view.delta >= 0 else "crimson"
 
     # Graphique interactif de l'évolution de l'ETF sur la période globale choisie dans la barre latérale
-    fig = make_timeseries_fig(data, period)
-
-    # Couleur du cadre de titre basée sur le score global
-    border_color, bg_color = score_to_colors(raw_scores[name])
+    fig = price_fig(view.series, period)
 
     # --- CARTE COMPLÈTE ---
     with cols[idx % 2]:
         begin_card()
 
-        # Titre + variation % + score global dans un cadre coloré
+        # Titre + variation % + score global dans un cadre coloré (couleur selon le score global)
         st.markdown(
-            f"<div style='border:2px solid {border_color};background-color:{bg_color};border-radius:4px;padding:4px;margin-bottom:8px;'>"
-            f"<strong>{name}: {last:.2f} "
-            f"<span style='color:{perf_color}'>{delta:+.2f}%</span> | Score = {raw_scores[name]:+.1f}</strong>"
+            f"<div style='border:2px solid {view.border_color};background-color:{view.bg_color};border-radius:4px;padding:4px;margin-bottom:8px;'>"
+            f"<strong>{view.name}: {view.last:.2f} "
+            f"<span style='color:{perf_color}'>{view.delta:+.2f}%</span> | Score = {view.total:+.1f}</strong>"
             "</div>",
             unsafe_allow_html=True,
         )
@@ -235,10 +251,17 @@ for idx, (name, series) in enumerate(prices.items()):
         # Graphique
         st.plotly_chart(fig, use_container_width=True)
 
+        # Historique du score total, lu depuis le magasin matérialisé
+        if view.history is not None and not view.history.empty:
+            st.plotly_chart(
+                make_score_history_fig(view.history, period),
+                use_container_width=True,
+                key=f"score_history_{view.name}",
+            )
+
         # Badges colorés reflétant le score sur chaque période
         badge_cols = st.columns(len(TIMEFRAMES))
-        for i, (lbl, _w) in enumerate(TIMEFRAMES.items()):
-            score, arrow, bg = tf_scores[name][lbl]
+        for i, (lbl, score, arrow, bg) in enumerate(view.badges()):
             with badge_cols[i]:
                 st.markdown(
                     f"<span style='background:{bg};color:black;padding:4px;border-radius:4px;font-size:12px;display:block;text-align:center;'>"
@@ -248,13 +271,10 @@ for idx, (name, series) in enumerate(prices.items()):
                 )
 
         # Macro-indicateurs affichés en bas de la carte
-        items = []
-        for lbl in MACRO_SERIES:
-            if lbl in macro_df and not macro_df[lbl].dropna().empty:
-                val = macro_df[lbl].dropna().iloc[-1]
-                items.append(f"<li>{lbl}: {val:.2f}</li>")
-            else:
-                items.append(f"<li>{lbl}: N/A</li>")
+        items = [
+            f"<li>{lbl}: {val:.2f}</li>" if val is not None else f"<li>{lbl}: N/A</li>"
+            for lbl, val in view.macro
+        ]
         st.markdown(
             "<ul style='columns:2;margin-top:8px;'>" + "".join(items) + "</ul>",
             unsafe_allow_html=True
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""Les tests relisent les données enregistrées de tests/fixtures (aucun accès réseau)."""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'recordings')
+
+# Surchargeable, p. ex. DCA_DATA_PROVIDER=live pytest
+os.environ.setdefault('DCA_DATA_PROVIDER', 'replay')
+os.environ.setdefault('DCA_DATA_DIR', FIXTURES)
+
+
+@pytest.fixture
+def recordings_dir():
+    """Répertoire des enregistrements rejoués par les tests."""
+    return FIXTURES
+
+
+@pytest.fixture
+def price_panel():
+    """
+    Fabrique de panels S&P500 / CAC40 : marches aléatoires sur `n` séances,
+    ou, si `sp500` est donné, ces cours quotidiens face à un CAC40 constant.
+    """
+    def make(n=400, seed=0, start='2020-01-01', sp500=None):
+        if sp500 is not None:
+            idx = pd.date_range(start, periods=len(sp500), freq='D')
+            return pd.DataFrame({'S&P500': sp500, 'CAC40': [100.0] * len(sp500)}, index=idx)
+        idx = pd.bdate_range(start, periods=n)
+        rng = np.random.default_rng(seed)
+        return pd.DataFrame({
+            'S&P500': 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n))),
+            'CAC40': 50 * np.exp(np.cumsum(rng.normal(0, 0.01, n))),
+        }, index=idx)
+    return make
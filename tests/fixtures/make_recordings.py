@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Régénère les enregistrements rejoués par les tests (tests/fixtures/recordings).
+
+Par défaut, les séries sont synthétiques et déterministes : marches
+aléatoires de 1450 séances jusqu'au 30/06/2025 pour chaque ETF, séries
+mensuelles sur 6 ans pour chaque indicateur macro. ``--live`` les remplace
+par de vraies cotations (yfinance, FRED avec la clé FRED_API_KEY) ; les
+dates attendues par les tests (dernière séance au 30/06/2025) changent alors.
+
+Lancement depuis la racine du dépôt :
+``python tests/fixtures/make_recordings.py [--live]``
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from dca_dashboard.constants import ETFS, MACRO_SERIES, TIMEFRAMES  # noqa: E402
+from dca_dashboard.data_loader import RecordProvider, ReplayProvider  # noqa: E402
+
+DIRECTORY = os.path.join(os.path.dirname(__file__), 'recordings')
+
+
+def synthetic(directory: str = DIRECTORY):
+    """Écrit les séries synthétiques (graine fixe) dans `directory`."""
+    provider = ReplayProvider(directory)
+    idx = pd.bdate_range(end='2025-06-30', periods=1450, name='Date')
+    rng = np.random.default_rng(2025)
+    for i, ticker in enumerate(ETFS.values()):
+        prices = 100 * (i + 1) * np.exp(np.cumsum(rng.normal(2e-4, 0.011, len(idx))))
+        provider.save('prix', ticker, pd.Series(np.round(prices, 4), index=idx))
+    midx = pd.date_range(end='2025-06-01', periods=72, freq='MS')
+    for i, code in enumerate(MACRO_SERIES.values()):
+        values = 5 + i + np.cumsum(rng.normal(0, 0.1, len(midx)))
+        provider.save('macro', code, pd.Series(np.round(values, 3), index=midx))
+
+
+def live(directory: str = DIRECTORY):
+    """Enregistre les vraies séries sur les mêmes périodes que data_loader."""
+    provider = RecordProvider(directory)
+    end = datetime.today()
+    start = end - timedelta(days=int(max(TIMEFRAMES.values()) * 1.1))
+    for ticker in ETFS.values():
+        provider.prices(ticker, start, end)
+    api_key = os.environ['FRED_API_KEY']
+    for code in MACRO_SERIES.values():
+        provider.macro(code, end - timedelta(days=365 * 6), end, api_key)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Régénère les enregistrements des tests")
+    parser.add_argument('--live', action='store_true',
+                        help="Enregistre les vraies séries (réseau et FRED_API_KEY requis)")
+    parser.add_argument('--dir', default=DIRECTORY, help="Répertoire de destination")
+    args = parser.parse_args(argv)
+    (live if args.live else synthetic)(args.dir)
+
+
+if __name__ == '__main__':
+    main()
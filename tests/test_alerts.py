@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import json
+import pytest
+from dca_dashboard import alerts
+from dca_dashboard.alerts import AlertEngine, AlertRule, FileSink, TOTAL
+
+
+def test_rule_rejects_unknown_horizon():
+    with pytest.raises(ValueError):
+        AlertRule('S&P500', 'Décennal', 0.0)
+
+
+def test_rule_rejects_unknown_etf():
+    with pytest.raises(ValueError):
+        AlertRule('SP500', 'Hebdo', 0.0)
+
+
+def test_crossing_fires_once_and_writes_sink(tmp_path, price_panel):
+    path = tmp_path / 'alerts.jsonl'
+    engine = AlertEngine(
+        [AlertRule('S&P500', 'Hebdo', -0.5, 'baisse'), AlertRule('S&P500', TOTAL, 2.0, 'hausse')],
+        [FileSink(str(path))],
+        threshold_pct=10,
+    )
+    # Référence : prix stable -> scores nuls
+    assert engine.evaluate(price_panel(sp500=[100.0] * 20)) == []
+    # Forte hausse -> scores négatifs, franchissement à la baisse de -0.5 en Hebdo
+    fired = engine.evaluate(price_panel(sp500=[100.0] * 20 + [150.0]))
+    assert [a.rule.horizon for a in fired] == ['Hebdo']
+    assert fired[0].current <= -0.5 < fired[0].previous
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert json.loads(lines[0])['etf'] == 'S&P500'
+
+
+def test_unchanged_tickers_are_not_rescored(monkeypatch, price_panel):
+    engine = AlertEngine([AlertRule('S&P500', 'Hebdo', 0.5)])
+    calls = []
+    real = alerts.timeframe_scores
+    monkeypatch.setattr(alerts, 'timeframe_scores', lambda s, t, m: calls.append(s.name) or real(s, t, m))
+    prices = price_panel(sp500=[100.0] * 10)
+    engine.evaluate(prices)
+    engine.evaluate(prices)
+    # CAC40 n'a aucune règle, S&P500 n'a pas de nouvelle cotation au 2e tick
+    assert calls == ['S&P500']
+
+
+def test_failing_sink_keeps_alerts_and_service_survives(tmp_path, price_panel):
+    class FlakySink:
+        def __init__(self):
+            self.fail, self.received = True, []
+
+        def send(self, batch):
+            if self.fail:
+                raise OSError('webhook indisponible')
+            self.received.extend(batch)
+
+    flaky, path = FlakySink(), tmp_path / 'alerts.jsonl'
+    engine = AlertEngine([AlertRule('S&P500', 'Hebdo', -0.5, 'baisse')],
+                         [flaky, FileSink(str(path))], threshold_pct=10)
+    spike = price_panel(sp500=[100.0] * 20 + [150.0])
+    ticks = iter([price_panel(sp500=[100.0] * 20), spike, spike])
+    alerts.run(engine, loader=lambda: next(ticks), interval=0, iterations=3)
+    # Le sink fichier a reçu l'alerte malgré l'échec du premier sink
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 1
+    assert flaky.received == []
+    # Au tick suivant réussi, l'alerte en attente est renvoyée
+    flaky.fail = False
+    engine.evaluate(price_panel(sp500=[100.0] * 23))
+    assert [a.rule.horizon for a in flaky.received] == ['Hebdo']
+
+
+def test_run_survives_loader_error():
+    engine = AlertEngine([AlertRule('S&P500', 'Hebdo', 0.5)])
+
+    def loader():
+        raise ConnectionError('réseau')
+
+    alerts.run(engine, loader=loader, interval=0, iterations=2)
+
+
+def test_engine_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        AlertEngine([AlertRule('S&P500', 'Hebdo', 0.5)], mode='moyenne_geo')
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+from dca_dashboard.cache import CacheNamespace, cached, get_namespace, invalidate_tag, series_key
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    ns = CacheNamespace('t', max_entries=2)
+    ns.set('a', 1)
+    ns.set('b', 2)
+    ns.get('a')
+    ns.set('c', 3)
+    assert 'a' in ns and 'b' not in ns and 'c' in ns
+    assert ns.stats()['évictions'] == 1
+
+    big = pd.Series(range(1000), dtype='float64')
+    ns = CacheNamespace('t', max_entries=10, max_bytes=10_000)
+    ns.set('x', big)
+    ns.set('y', big)
+    assert 'x' not in ns and 'y' in ns
+    assert ns.bytes <= 10_000
+
+
+def test_ttl_and_purge():
+    clock = _Clock()
+    ns = CacheNamespace('t', ttl=10, clock=clock)
+    ns.set('a', 1)
+    clock.now = 5
+    ns.set('b', 2)
+    clock.now = 12
+    assert ns.purge_expired() == 1
+    assert ns.get('a') is None and ns.get('b') == 2
+    s = ns.stats()
+    assert (s['hits'], s['misses'], s['expirations']) == (1, 1, 1)
+
+
+def test_cached_targeted_invalidation():
+    calls = []
+
+    @cached('test_cache', tags=lambda name: [name])
+    def load(name):
+        calls.append(name)
+        return name.upper()
+
+    assert load('spy') == load('spy') == 'SPY'
+    load('qqq')
+    assert invalidate_tag('spy') == 1
+    load('spy')
+    load('qqq')
+    assert calls == ['spy', 'qqq', 'spy']
+    get_namespace('test_cache').clear()
+
+
+def test_series_key_hits_with_trailing_nan():
+    calls = []
+
+    @cached('test_cache', key=series_key)
+    def last(s):
+        calls.append(s.name)
+        return s.dropna().iloc[-1]
+
+    # Jour férié : dernière ligne vide, alignée sur le calendrier du S&P500
+    s = pd.Series([1.0, 2.0, np.nan], index=pd.bdate_range('2024-01-01', periods=3), name='CAC40')
+    for _ in range(3):
+        assert last(s) == 2.0
+    assert calls == ['CAC40']
+    assert series_key(s) != series_key(s.fillna(3.0))
+    get_namespace('test_cache').clear()
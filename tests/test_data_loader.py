@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
+import sys
+import types
 import pytest
 import pandas as pd
-from dca_dashboard.data_loader import load_prices, load_macro
+from dca_dashboard import data_loader
+from dca_dashboard.data_loader import (
+    load_prices, load_macro, RecordProvider, ReplayProvider, set_provider,
+)
 
 def test_load_prices_structure():
     df = load_prices()
@@ -9,9 +14,51 @@ def test_load_prices_structure():
     from dca_dashboard.constants import ETFS
     for name in ETFS:
         assert name in df.columns
+        assert df[name].notna().any()
 
 def test_load_macro_empty_when_no_key(monkeypatch):
-    import streamlit as st
-    monkeypatch.setattr(st, 'secrets', {})
-    df = load_macro()
+    # Seul st.secrets est lu : inutile d'importer streamlit pour ce test
+    monkeypatch.setitem(sys.modules, 'streamlit', types.SimpleNamespace(secrets={}))
+    try:
+        set_provider(data_loader.LiveProvider())
+        df = load_macro()
+    finally:
+        set_provider(None)
     assert df.empty
+
+def test_load_macro_replay_without_key():
+    # Le replay ne lit pas st.secrets : aucune clé FRED nécessaire
+    df = load_macro()
+    assert not df.dropna(how='all').empty
+
+def test_record_then_replay(tmp_path, recordings_dir):
+    recorder = RecordProvider(str(tmp_path), upstream=ReplayProvider(recordings_dir))
+    replay = ReplayProvider(str(tmp_path))
+    recorded = recorder.prices('SPY', None, None)
+    pd.testing.assert_series_equal(replay.prices('SPY', None, None), recorded)
+    recorded = recorder.macro('DGS10', None, None, '')
+    pd.testing.assert_series_equal(replay.macro('DGS10', None, None, ''), recorded)
+
+def test_replay_missing_recording(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ReplayProvider(str(tmp_path)).prices('SPY', None, None)
+
+def test_unknown_provider(monkeypatch):
+    monkeypatch.setenv('DCA_DATA_PROVIDER', 'ftp')
+    monkeypatch.setattr(data_loader, '_provider', None)
+    with pytest.raises(ValueError):
+        data_loader.get_provider()
+
+def test_invalidate_stale_prices_targets_old_quotes():
+    from datetime import datetime
+    from dca_dashboard.cache import get_namespace
+    from dca_dashboard.data_loader import invalidate_stale_prices, latest_session
+    assert latest_session(datetime(2025, 7, 5)) == pd.Timestamp('2025-07-04')
+    load_prices()
+    ns = get_namespace('prix')
+    n = len(ns)
+    # Enregistrements arrêtés au lundi 30/06/2025
+    assert invalidate_stale_prices(datetime(2025, 6, 30, 18)) == []
+    assert len(ns) == n
+    stale = invalidate_stale_prices(datetime(2025, 7, 1))
+    assert len(stale) == n and len(ns) == 0
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import json
+import numpy as np
+import pyarrow as pa
+import pytest
+from dca_dashboard.export import get_table, project, to_ipc_bytes
+from dca_dashboard.history import score_frame
+
+
+def test_price_projection_and_ipc_roundtrip(price_panel):
+    prices = price_panel()
+    start, end = prices.index[10], prices.index[19]
+    table = get_table('prix', columns=['CAC40'], start=start, end=end, prices=prices)
+    assert table.column_names == ['date', 'CAC40']
+    assert table.num_rows == 10
+    back = pa.ipc.open_stream(to_ipc_bytes(table)).read_all()
+    assert back.equals(table)
+    assert np.allclose(back.column('CAC40').to_numpy(), prices['CAC40'].iloc[10:20])
+
+
+def test_allocations_sum_to_100(price_panel):
+    prices = price_panel()
+    table = get_table('allocations', start=prices.index[-5], prices=prices)
+    assert table.column_names == ['date', 'etf', 'score', 'poids']
+    assert table.num_rows == 5 * 2
+    sums = table.group_by('date').aggregate([('poids', 'sum')]).column('poids_sum')
+    assert np.allclose(sums.to_numpy(), 100, atol=1e-3)
+    with pytest.raises(KeyError):
+        get_table('inconnue', prices=prices)
+
+
+def test_score_range_matches_history(price_panel):
+    prices = price_panel()
+    day = prices.index[-30]
+    table = get_table('scores', columns=['Total'], start=day, end=day, prices=prices)
+    expected = score_frame(prices, 15.0).query('date == @day')
+    assert table.column('etf').to_pylist() == list(expected['etf'].astype(str))
+    assert np.allclose(table.column('Total').to_numpy(), expected['Total'])
+
+
+def test_date_range_on_table_without_dates():
+    with pytest.raises(ValueError):
+        project(pa.table({'etf': ['CAC40']}), start='2024-01-01')
+
+
+def test_flight_do_get(price_panel):
+    flight = pytest.importorskip('pyarrow.flight')
+    from dca_dashboard.export import ExportFlightServer
+    prices = price_panel()
+    server = ExportFlightServer('grpc://127.0.0.1:0', loader=lambda: prices)
+    try:
+        client = flight.connect(f'grpc://127.0.0.1:{server.port}')
+        last = str(prices.index[-1].date())
+        ticket = flight.Ticket(json.dumps({'table': 'scores', 'columns': ['Total'], 'start': last}))
+        table = client.do_get(ticket).read_all()
+        assert table.column_names == ['date', 'etf', 'Total']
+        assert table.num_rows == 2
+    finally:
+        server.shutdown()
+
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from dca_dashboard.constants import TIMEFRAMES
+from dca_dashboard import history
+from dca_dashboard.history import ScoreHistory, score_frame
+from dca_dashboard.scoring import recommended_weights, timeframe_scores
+
+
+def test_score_frame_matches_timeframe_scores(price_panel):
+    prices = price_panel(60)
+    df = score_frame(prices, 5)
+    for day in (prices.index[30], prices.index[-1]):
+        row = df[(df['date'] == day) & (df['etf'] == 'S&P500')].iloc[0]
+        expected = timeframe_scores(prices['S&P500'].loc[:day], 5)
+        for lbl in TIMEFRAMES:
+            assert row[lbl] == expected[lbl][0]
+    weights = df.groupby('date')['Poids'].sum()
+    assert np.allclose(weights[weights > 0], 100, atol=1e-3)
+
+
+def test_holiday_keeps_last_score_in_weights(price_panel):
+    prices = price_panel(60)
+    day, before = prices.index[40], prices.index[39]
+    prices.loc[day, 'CAC40'] = np.nan
+    df = score_frame(prices, 5).set_index(['date', 'etf'])
+    totals = {'S&P500': df.loc[(day, 'S&P500'), 'Total'],
+              'CAC40': df.loc[(before, 'CAC40'), 'Total']}
+    expected = recommended_weights(totals)['S&P500']
+    assert df.loc[(day, 'S&P500'), 'Poids'] == pytest.approx(expected, abs=1e-3)
+    assert (day, 'CAC40') not in df.index
+
+
+def test_incremental_append_and_query(tmp_path, price_panel):
+    prices = price_panel(60)
+    store = ScoreHistory(str(tmp_path), threshold_pct=10)
+    assert store.update(prices.iloc[:-5]) == 2 * (len(prices) - 5)
+    assert store.update(prices) == 10
+    assert store.update(prices) == 0
+    full = score_frame(prices, 10)
+    got = store.query()
+    assert len(got) == len(full)
+    part = store.query(start=prices.index[-3], etfs=['CAC40'], columns=['Total'])
+    assert list(part.columns) == ['date', 'etf', 'Total']
+    assert len(part) == 3 and set(part['etf']) == {'CAC40'}
+
+
+def test_failed_etf_is_backfilled(tmp_path, price_panel):
+    prices = price_panel(60)
+    store = ScoreHistory(str(tmp_path), threshold_pct=10)
+    failed = prices.copy()
+    failed['CAC40'] = np.nan
+    store.update(failed)
+    assert store.update(prices) == len(prices)
+    got = store.query()
+    assert got.groupby('etf').size().to_dict() == {'CAC40': len(prices), 'S&P500': len(prices)}
+    # Pondérations recalculées avec les deux ETF, comme un calcul complet
+    full = score_frame(prices, 10)
+    assert np.allclose(got.sort_values(['date', 'etf'])['Poids'], full['Poids'])
+
+
+def test_lagging_etf_catches_up(tmp_path, price_panel):
+    prices = price_panel(60)
+    store = ScoreHistory(str(tmp_path), threshold_pct=10)
+    lagging = prices.copy()
+    lagging.iloc[-3:, lagging.columns.get_loc('CAC40')] = np.nan
+    store.update(lagging)
+    assert store.last_dates()['CAC40'] == prices.index[-4]
+    store.update(prices)
+    got = store.query().sort_values(['date', 'etf']).reset_index(drop=True)
+    full = score_frame(prices, 10)
+    assert len(got) == len(full)
+    assert np.allclose(got['Poids'], full['Poids'])
+
+
+def test_unknown_mode_rejected_before_writing(tmp_path):
+    with pytest.raises(ValueError):
+        ScoreHistory(str(tmp_path), mode='moyenne_geo')
+    assert not any(tmp_path.iterdir())
+
+
+def test_failed_write_keeps_stored_history(tmp_path, monkeypatch, price_panel):
+    prices = price_panel(60)
+    store = ScoreHistory(str(tmp_path), threshold_pct=10)
+    store.update(prices.iloc[:-5])
+    before = store.query()
+
+    def disk_full(self, path, **kwargs):
+        open(path, 'wb').close()
+        raise OSError('disque plein')
+
+    monkeypatch.setattr(pd.DataFrame, 'to_parquet', disk_full)
+    with pytest.raises(OSError):
+        store.update(prices)
+    monkeypatch.undo()
+    pd.testing.assert_frame_equal(store.query(), before)
+    assert [p.suffix for p in tmp_path.rglob('part-*')] == ['.parquet']
+
+
+def test_concurrent_updates(tmp_path, monkeypatch, price_panel):
+    prices = price_panel(60)
+    # CAC40 absent : les mises à jour suivantes réécrivent le fichier existant
+    failed = prices.copy()
+    failed['CAC40'] = np.nan
+    ScoreHistory(str(tmp_path), threshold_pct=10).update(failed)
+    real = history.score_frame
+
+    def slow_score_frame(*args):
+        # Élargit la fenêtre où deux mises à jour se chevaucheraient
+        time.sleep(0.02)
+        return real(*args)
+
+    monkeypatch.setattr(history, 'score_frame', slow_score_frame)
+    errors = []
+
+    def update():
+        try:
+            ScoreHistory(str(tmp_path), threshold_pct=10).update(prices)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=update) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(ScoreHistory(str(tmp_path), threshold_pct=10).query()) == 2 * len(prices)
@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
+import numpy as np
 import pandas as pd
-from dca_dashboard.scoring import pct_change, score_and_style
+from dca_dashboard.scoring import (
+    pct_change, score_and_style, recommended_weights,
+    timeframe_scores, rolling_deviations, score_array,
+)
 
 def test_pct_change_empty():
     assert pct_change(pd.Series(dtype=float)) == 0.0
@@ -15,3 +19,29 @@ def test_score_and_style():
     assert score_and_style(0.0, 10) == (0.0, '→', '#90CAF9')
     assert score_and_style(0.05, 10) == (-0.5, '↗', '#FFB74D')
     assert score_and_style(0.2, 10) == (-1.0, '↑', '#E57373')
+
+def test_recommended_weights_shift_and_normalize():
+    w = recommended_weights({'A': -1.0, 'B': 1.0, 'C': 0.0})
+    assert w == {'A': 0.0, 'B': 2 / 3 * 100, 'C': 1 / 3 * 100}
+    assert recommended_weights({'A': 0.0, 'B': 0.0}) == {'A': 0.0, 'B': 0.0}
+
+def test_timeframe_scores_robust_modes():
+    # Krach isolé dans la fenêtre : la moyenne est tirée vers le bas,
+    # pas la médiane ni le rang percentile
+    idx = pd.date_range('2024-01-01', periods=30, freq='D')
+    s = pd.Series([100.0] * 28 + [1.0, 101.0], index=idx)
+    assert timeframe_scores(s, 4, 'moyenne')['Mensuel'][0] == -1.0
+    assert timeframe_scores(s, 4, 'mediane')['Mensuel'][0] == -0.5
+    assert timeframe_scores(s, 4, 'percentile')['Mensuel'][0] == -1.0
+    assert set(timeframe_scores(s, 10, 'ema')) == set(timeframe_scores(s, 10))
+
+
+def test_rolling_deviations_match_last_point():
+    idx = pd.bdate_range('2023-01-02', periods=300)
+    s = pd.Series(np.round(100 + np.cumsum(np.sin(np.arange(300))), 1), index=idx)
+    for mode in ('moyenne', 'percentile', 'mediane', 'ema'):
+        dev = rolling_deviations(s, mode)
+        for k in (0, 120, 299):
+            expected = timeframe_scores(s.iloc[:k + 1], 5, mode)
+            got = score_array(dev.iloc[k].to_numpy(), 5)
+            assert list(got) == [v[0] for v in expected.values()]
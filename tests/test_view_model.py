@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+from dca_dashboard.constants import MACRO_SERIES, TIMEFRAMES
+from dca_dashboard.scoring import timeframe_scores
+from dca_dashboard.view_model import build_view, history_by_etf, macro_summary
+
+
+def test_build_view_single_pass_record():
+    idx = pd.date_range('2024-01-01', periods=60, freq='D')
+    s = pd.Series(np.linspace(100, 130, 60), index=idx, name='S&P500')
+    s.iloc[[5, 30]] = np.nan
+    view = build_view(s, 10)
+    clean = s.dropna()
+    assert view.name == 'S&P500' and len(view.series) == 58
+    assert view.last == 130.0
+    assert round(view.delta, 4) == round((130 / clean.iloc[-2] - 1) * 100, 4)
+    expected = timeframe_scores(clean, 10)
+    assert [(l, sc, a, c) for l, sc, a, c in view.badges()] == [(l, *expected[l]) for l in TIMEFRAMES]
+    assert view.total == sum(v[0] for v in expected.values())
+    assert view.means[0] == clean[clean.index >= idx[-1] - pd.Timedelta(days=7)].mean()
+    assert view.border_color == 'crimson'
+    assert not hasattr(view, '__dict__')
+
+
+def test_empty_series_and_macro_summary():
+    view = build_view(pd.Series([np.nan, np.nan], dtype=float, name='CAC40'), 10)
+    assert view.empty and view.total == 0.0 and view.border_color == 'gray'
+    macro = pd.DataFrame({'CAPE10': [30.0, np.nan], 'ECY': [np.nan, np.nan]})
+    summary = dict(macro_summary(macro))
+    assert list(summary) == list(MACRO_SERIES)
+    assert summary['CAPE10'] == 30.0 and summary['ECY'] is None and summary['CPI YoY'] is None
+
+
+def test_history_by_etf_attaches_slices():
+    dates = pd.date_range('2024-01-01', periods=3, freq='D')
+    hist = pd.DataFrame({
+        'date': list(dates) * 2,
+        'etf': ['S&P500'] * 3 + ['CAC40'] * 3,
+        'Total': [1.0, 2.0, 3.0, -1.0, -2.0, -3.0],
+    })
+    by_etf = history_by_etf(hist)
+    assert list(by_etf['CAC40']) == [-1.0, -2.0, -3.0]
+    s = pd.Series([100.0, 101.0, 102.0], index=dates, name='CAC40')
+    view = build_view(s, 10, history=by_etf['CAC40'])
+    assert view.history.index.equals(dates)